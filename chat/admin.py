@@ -12,6 +12,8 @@ class UserAdmin(admin.ModelAdmin):
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'age', 'bio')
     search_fields = ('user__username',)
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
 
 
 @admin.register(Message)
@@ -19,21 +21,29 @@ class MessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'timestamp', 'content')
     search_fields = ('sender__username', 'content')
     list_filter = ('timestamp',)
+    list_select_related = ('sender',)
+    autocomplete_fields = ('sender',)
 
 
 @admin.register(Attachment)
 class AttachmentAdmin(admin.ModelAdmin):
     list_display = ('message', 'file', 'uploaded_at')
     search_fields = ('message__content',)
+    list_select_related = ('message__sender', 'added_by')  # Message.__str__ sender ni ishlatadi
+    autocomplete_fields = ('message', 'added_by')
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'message', 'is_read', 'created_at')
     list_filter = ('is_read',)
+    list_select_related = ('user', 'message__sender')
+    autocomplete_fields = ('user', 'message')
 
 
 @admin.register(FriendRequest)
 class FriendRequestAdmin(admin.ModelAdmin):
     list_display = ('from_user', 'to_user', 'created_at')
     search_fields = ('from_user__username', 'to_user__username')
+    list_select_related = ('from_user', 'to_user')
+    autocomplete_fields = ('from_user', 'to_user')
@@ -0,0 +1,21 @@
+# Generated by Django 5.0 on 2026-10-15 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_chat_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chat_messag_chat_id_fa2313_idx',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat', '-timestamp', '-id'], name='chat_messag_chat_id_81f15c_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-15 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_message_chat_timestamp_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='friendrequest',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'created_at'], name='chat_friend_to_user_2aa258_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendrequest',
+            constraint=models.UniqueConstraint(fields=('from_user', 'to_user'), name='uniq_fr_pair'),
+        ),
+    ]
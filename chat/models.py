@@ -10,6 +10,12 @@ class Message(models.Model):
     sender = models.ForeignKey(User, related_name='sent_messages', on_delete=models.CASCADE)  # Kim yozganini saqlaymiz
     content = models.TextField()                 # Xabar matni
     timestamp = models.DateTimeField(default=timezone.now)  # Vaqti
+    chat = models.ForeignKey('Chat', related_name='messages', on_delete=models.CASCADE, null=True, blank=True, db_index=False)  # Qaysi chatga yuborilgan (indeks Meta.indexes dagi kompozit indeksda)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat', '-timestamp', '-id']),  # Chat tarixini sahifalash uchun
+        ]
 
     def __str__(self):
         return f'{self.sender.username}: {self.content[:20]}'
@@ -40,6 +46,11 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False) # O'qilganmi yoki yo'qmi 
     created_at = models.DateTimeField(auto_now_add=True) # Qachon yaratilgan
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at']),  # Foydalanuvchi bildirishnomalari ro'yxati uchun
+        ]
+    
     def __str__(self):
         return f'Notification for {self.user.username} - Read: {self.is_read}'
 
@@ -49,7 +60,13 @@ class FriendRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True) # Qachon so'rov yuborilgan 
     
     class Meta:
-        unique_together = ('from_user', 'to_user')
+        constraints = [
+            models.UniqueConstraint(fields=['from_user', 'to_user'], name='uniq_fr_pair'),  # Takroriy so'rovlarga yo'l qo'ymaslik
+        ]
+        indexes = [
+            models.Index(fields=['to_user', 'from_user']),  # Qarama-qarshi so'rovni tez topish uchun
+            models.Index(fields=['to_user', 'created_at']),  # Kelgan so'rovlar ro'yxati uchun
+        ]
     
     def __str__(self):
         return f'{self.from_user.username} -> {self.to_user.username}'
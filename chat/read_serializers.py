@@ -0,0 +1,59 @@
+from django.utils import timezone
+
+
+def _format_datetime(value):
+    # DRF DateTimeField bilan bir xil ISO 8601 natija
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ReadSerializer:
+    """
+    Faqat o'qish uchun yengil serializer: DRF field mashinasisiz to'g'ridan-to'g'ri dict quradi.
+    List endpointlarda `FastMessageSerializer(qs, many=True).data` ko'rinishida ishlatiladi.
+    Voris klasslar `to_representation(obj)` orqali bitta obyekt uchun dict quradi.
+    """
+
+    def __init__(self, instance=None, many=False):
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(obj) for obj in self.instance]
+        return self.to_representation(self.instance)
+
+
+class FastUserSerializer(ReadSerializer):
+    # UserSerializer bilan bir xil maydonlar
+
+    def to_representation(self, user):
+        return {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'is_active': user.is_active,
+            'is_staff': user.is_staff,
+        }
+
+
+class FastMessageSerializer(ReadSerializer):
+    # MessageDetailSerializer bilan bir xil maydonlar (sender ichma-ich)
+    sender = FastUserSerializer()
+
+    def to_representation(self, message):
+        return {
+            'id': message.id,
+            'sender': self.sender.to_representation(message.sender),
+            'content': message.content,
+            'timestamp': _format_datetime(message.timestamp),
+        }
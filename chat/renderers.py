@@ -0,0 +1,22 @@
+import orjson
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class OrjsonRenderer(renderers.BaseRenderer):
+    """
+    JSONRenderer o'rniga orjson (C/Rust kengaytma) bilan tezkor JSON renderer.
+    orjson bilmaydigan turlar (Decimal, lazy matnlar va h.k.) DRF JSONEncoder ga topshiriladi.
+    datetime/date/time ham JSONEncoder ga o'tkaziladi, shunda format JSONRenderer bilan bir xil bo'ladi.
+    Farq: NaN/Infinity orjson da null bo'ladi, JSONRenderer esa xato beradi.
+    Chat tarixi kabi katta list javoblar uchun `renderer_classes` ga qo'shiladi.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.options)
@@ -1,7 +1,18 @@
+from django.utils import timezone
 from rest_framework import serializers
 from .models import User, Message, Profile, Attachment, Notification, FriendRequest
 
 
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S" # created_at maydonlari uchun chiqish formati
+
+
+def _format_created_at(value):
+    # DateTimeField(format=...) o'rniga: har bir qator uchun to'g'ridan-to'g'ri strftime
+    if value is None:
+        return None
+    return timezone.localtime(value).strftime(_DATETIME_FORMAT)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -10,15 +21,33 @@ class UserSerializer(serializers.ModelSerializer):
         
 
 class MessageSerializer(serializers.ModelSerializer):
-    sender = UserSerializer(read_only=True) # Senderni faqat o'qish uchun
+    sender_id = serializers.IntegerField(read_only=True) # Yuboruvchi id si (ichki UserSerializer o'rniga)
+    sender_username = serializers.CharField(source='sender.username', read_only=True) # Yuboruvchi username i
     
     
     class Meta:
         model = Message
-        fields = ['id', 'sender', 'content', 'timestamp']
+        fields = ['id', 'sender_id', 'sender_username', 'content', 'timestamp']
         read_only_fields = ['timestamp'] # timestamp faqat o'qish uchun
         
         
+class MessageDetailSerializer(MessageSerializer):
+    sender = serializers.SerializerMethodField() # To'liq sender kerak bo'lgan endpointlar uchun
+    
+    
+    class Meta(MessageSerializer.Meta):
+        fields = ['id', 'sender', 'content', 'timestamp']
+
+    def get_sender(self, obj):
+        # Chat tarixida bir xil yuboruvchilar takrorlanadi: har biri bitta serializatsiya
+        # davomida bir marta render qilinadi (kesh self.context da, so'rovdan tashqariga chiqmaydi)
+        rendered = self.context.setdefault('_rendered_senders', {})
+        data = rendered.get(obj.sender_id)
+        if data is None:
+            data = rendered[obj.sender_id] = dict(UserSerializer(obj.sender).data)
+        return dict(data)
+        
+        
 class ProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True) # Userni faqat o'qish uchun
     
@@ -43,24 +72,29 @@ class AttachmentSerializer(serializers.ModelSerializer):
 class NotificationSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True) # Kimga bildirishnomaligini faqat o'qish uchun
     message = MessageSerializer(read_only=True) # Qaysi xabarga bog'langanligini faqat o'qish uchun
-    created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True) # Qachon yaratilganligini faqat o'qish uchun
-    is_read = serializers.BooloeanField(default=False) # O'qilganmi yo'qmi tekshirish uchun
+    created_at = serializers.SerializerMethodField() # Qachon yaratilganligini faqat o'qish uchun
     
     class Meta:
         model = Notification
         fields = ['id', 'user', 'message', 'is_read', 'created_at']
         read_only_fields = ['created_at', 'user', 'message']
+
+    def get_created_at(self, obj):
+        return _format_created_at(obj.created_at)
         
 
 class FriendRequestSerializer(serializers.ModelSerializer):
     from_user = UserSerializer(read_only=True) # Kimdan so'rov kelganini faqat o'qish uchun
     to_user = UserSerializer(read_only=True) # Kimga so'rov kelganini faqat o'qish uchun
-    created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True) # Qachon so'rov yuborilganligini faqat o'qish uchun
+    created_at = serializers.SerializerMethodField() # Qachon so'rov yuborilganligini faqat o'qish uchun
      
     class Meta:
         model = FriendRequest
         fields = ['id', 'from_user', 'to_user', 'created_at']
         read_only_fields = ['created_at', 'from_user', 'to_user']
+
+    def get_created_at(self, obj):
+        return _format_created_at(obj.created_at)
         
 
     
@@ -1,65 +1,172 @@
-from typing import Optional, List, Union
+from datetime import datetime
+from typing import Optional, List, Tuple, Union
 import logging
 
+from django.core.cache import cache
 from django.db import transaction, IntegrityError
+from django.db.models import Q, QuerySet
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 
 from chat.models import User, Chat, Message
 
 logger = logging.getLogger(__name__)
 
+# Chat a'zoligi natijasi keshda saqlanadigan vaqt (soniya)
+MEMBERSHIP_CACHE_TIMEOUT = 60
+
+# Xabar matnining maksimal uzunligi (belgilarda)
+MAX_MESSAGE_LENGTH = 4096
+
 
 def get_object_id(obj):
     """Helper to get the id or pk of an object, or None if not present."""
     return getattr(obj, "id", getattr(obj, "pk", None))
 
 
-def get_object_id(obj):
-    """Helper to get id or pk from an object, or None if not present."""
-    return getattr(obj, "id", getattr(obj, "pk", None))
+def membership_cache_key(chat_id: int, user_id: int) -> str:
+    """A'zolik natijasi uchun kesh kaliti (chat.signals ham shu kalitni o'chiradi)."""
+    return f"chat_member:{chat_id}:{user_id}"
+
+
+def _is_chat_member(chat: Chat, user: User) -> bool:
+    """
+    Foydalanuvchi chat a'zosi (yoki yaratuvchisi) ekanligini tekshiradi.
+    Ijobiy natija qisqa muddat keshda saqlanadi, shunda ketma-ket yuborilgan
+    xabarlar har safar a'zolik so'rovini bajarmaydi.
+    A'zo chiqarilganda kesh yozuvi chat.signals dagi m2m_changed qabul qiluvchisi orqali o'chiriladi.
+    """
+    if getattr(chat, "creator_id", None) == user.pk:
+        return True
+    key = membership_cache_key(chat.pk, user.pk)
+    if cache.get(key):
+        return True
+    is_member = chat.members.filter(pk=user.pk).exists()
+    if is_member:
+        cache.set(key, True, MEMBERSHIP_CACHE_TIMEOUT)
+    return is_member
+
+
+def _clean_content(content: Optional[str]) -> str:
+    """
+    Xabar matnini tozalaydi va tekshiradi (full_clean o'rniga).
+    - Bo'sh yoki MAX_MESSAGE_LENGTH dan uzun matn uchun full_clean kabi ValidationError ({"content": ...}) ko'taradi.
+    - FK/NOT NULL cheklovlarini DB o'zi tekshiradi (IntegrityError).
+    """
+    content = (content or "").strip()
+    if not content:
+        raise ValidationError({"content": "Message content cannot be empty."})
+    if len(content) > MAX_MESSAGE_LENGTH:
+        raise ValidationError({"content": f"Message content exceeds {MAX_MESSAGE_LENGTH} characters."})
+    return content
+
 
 def send_message(sender: User, content: str, chat: Chat) -> Message:
     """
     Berilgan `sender` tomonidan `chat`ga yuborilgan Message (xabari) yaratadi va qaytaradi.
-    - Matnni (bo'sh emasligini) tekshiradi.
+    - Matnni (bo'sh emasligi va uzunligini) tekshiradi; noto'g'ri bo'lsa ValidationError.
     - Yuboruvchi chat a'zosi (yoki yaratuvchisi) ekanligini tekshiradi.
     - Qisman yozuvlarni oldini olish uchun transaction ishlatadi.
     """
-    content = (content or "").strip()
-    is_member = chat.members.filter(pk=sender.pk).exists() or getattr(chat, "creator_id", None) == sender.pk
-    if not is_member:
-        logger.warning("User %s attempted to send message to chat %s but is not a member.", get_object_id(sender), get_object_id(chat))
-        raise PermissionError("Sender is not a member of the chat.")
-    is_member = chat.members.filter(pk=sender.pk).exists() or getattr(chat, "creator_id", None) == sender.pk
-    if not is_member:
+    content = _clean_content(content)
+    if not _is_chat_member(chat, sender):
         logger.warning("User %s attempted to send message to chat %s but is not a member.", get_object_id(sender), get_object_id(chat))
         raise PermissionError("Sender is not a member of the chat.")
 
     try:
         with transaction.atomic():
-            message = Message.objects.create(sender=sender, content=content, chat=chat)
-            # Agar Message modelida full_clean mavjud bo'lsa, validatsiya qiling
-            try:
-                message.full_clean()
-            except ValidationError:
-                # Agar validatsiya muvaffaqiyatsiz bo'lsa, rollback bo'ladi
-                raise
-            return message
+            return Message.objects.create(sender=sender, content=content, chat=chat)
     except IntegrityError as e:
         logger.error("Database error while sending message: %s", e)
         raise
 
 
-def get_chat_messages(chat: Chat, limit: int = 50, offset: int = 0, newest_first: bool = False) -> List[Message]:
+def send_messages_bulk(sender: User, chat: Chat, contents: List[str]) -> List[Message]:
+    """
+    Bir nechta xabarni bitta bulk INSERT bilan yaratadi va qaytaradi.
+    - A'zolik faqat bir marta tekshiriladi.
+    - Bo'sh matnlar tashlab yuboriladi; juda uzun matn bo'lsa ValidationError ko'taradi.
+    """
+    if not _is_chat_member(chat, sender):
+        logger.warning("User %s attempted to send messages to chat %s but is not a member.", get_object_id(sender), get_object_id(chat))
+        raise PermissionError("Sender is not a member of the chat.")
+
+    messages = [
+        Message(sender=sender, chat=chat, content=_clean_content(content))
+        for content in contents
+        if (content or "").strip()
+    ]
+    try:
+        with transaction.atomic():
+            return Message.objects.bulk_create(messages, batch_size=500)
+    except IntegrityError as e:
+        logger.error("Database error while sending messages: %s", e)
+        raise
+
+
+def get_chat_messages(
+    chat: Chat,
+    limit: int = 50,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    newest_first: bool = False,
+) -> QuerySet[Message]:
     """
-    Chat uchun xabarlarni oddiy sahifalash bilan qaytaradi.
+    Chat uchun xabarlarni keyset (cursor) sahifalash bilan qaytaradi.
     - limit: qaytariladigan maksimal xabar soni.
-    - offset: nechta xabarni o'tkazib yuborish.
+    - cursor: oldingi sahifadagi oxirgi xabarning (timestamp, id) juftligi; None bo'lsa birinchi sahifa.
     - newest_first: True bo'lsa, yangi xabarlar yuqoridan tartiblanadi.
+    - OFFSET ishlatilmaydi: har bir sahifa (chat, timestamp, id) indeksidan chegaralangan o'qish.
+    - sender JOIN orqali yuklanadi (N+1 oldini olish); attachments serializerlarda chiqarilmagani uchun yuklanmaydi.
+    - Baholanmagan (lazy) QuerySet qaytaradi: so'rov faqat iteratsiya/serializatsiya paytida bajariladi.
+    """
+    qs = (
+        Message.objects.filter(chat=chat)
+        .select_related("sender")
+        .only(
+            "id", "content", "timestamp", "sender_id",
+            "sender__id", "sender__username", "sender__email", "sender__first_name",
+            "sender__last_name", "sender__is_active", "sender__is_staff",
+        )
+    )
+    if cursor is not None:
+        ts, last_id = cursor
+        if newest_first:
+            qs = qs.filter(Q(timestamp__lt=ts) | Q(timestamp=ts, id__lt=last_id))
+        else:
+            qs = qs.filter(Q(timestamp__gt=ts) | Q(timestamp=ts, id__gt=last_id))
+    qs = qs.order_by("-timestamp", "-id") if newest_first else qs.order_by("timestamp", "id")
+    return qs[:limit]
+
+
+class MessageLoader:
     """
-    qs = Message.objects.filter(chat=chat)
-    qs = qs.order_by("-created_at" if newest_first else "created_at")
-    return list(qs[offset: offset + limit])
+    So'rov davomida kerak bo'lgan Message id larini yig'ib, ularni bitta `id__in` so'rovi bilan yuklaydi.
+    - load(id): id ni int ga o'giradi (so'rov ma'lumotidagi "5" ham) va takrorlanmasa navbatga qo'yadi.
+    - dispatch(): navbatdagi barcha id larni bitta so'rov bilan yuklaydi.
+    - get(id): yuklangan Message ni (topilmasa None) qaytaradi.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._pending = set()
+
+    def load(self, message_id: Union[int, str]) -> int:
+        message_id = int(message_id)
+        if message_id not in self._cache:
+            self._pending.add(message_id)
+        return message_id
+
+    def dispatch(self) -> None:
+        if not self._pending:
+            return
+        found = Message.objects.select_related("chat").in_bulk(self._pending)
+        for message_id in self._pending:
+            self._cache[message_id] = found.get(message_id)
+        self._pending.clear()
+
+    def get(self, message_id: Union[int, str]) -> Optional[Message]:
+        message_id = self.load(message_id)
+        self.dispatch()
+        return self._cache[message_id]
 
 
 def _resolve_message(message_or_id: Union[Message, int]) -> Optional[Message]:
@@ -85,19 +192,14 @@ def mark_message_as_read(message_or_id: Union[Message, int], reader: Optional[Us
         return None
 
     if reader is not None:
-        # Message modelida 'chat' ForeignKey mavjudligini ta'minlang; aks holda to'g'ri field nomini ishlating.
-        is_member = chat_obj.members.filter(pk=reader.pk).exists() or getattr(chat_obj, "creator_id", None) == reader.pk
-        if not is_member:
+        chat_obj = getattr(message, "chat", None)
+        if chat_obj is None or not _is_chat_member(chat_obj, reader):
             logger.warning(
                 "User %s attempted to mark message %s as read but is not a chat member.",
                 get_object_id(reader),
                 get_object_id(message),
             )
             raise PermissionError("User is not a member of the chat.")
-                get_object_id(reader),
-                get_object_id(message),
-            )
-            raise PermissionError("User is not a member of the chat.")
 
     if hasattr(message, "is_read"):
         logger.debug("Message model has 'is_read' field, but assignment is not supported. Skipping marking as read.")
@@ -108,6 +210,37 @@ def mark_message_as_read(message_or_id: Union[Message, int], reader: Optional[Us
     return message
 
 
+def mark_messages_as_read(message_ids: List[Union[int, str]], reader: Optional[User] = None) -> List[Message]:
+    """
+    Bir nechta xabarni o'qilgan deb belgilaydi.
+    - Xabarlar MessageLoader orqali bitta so'rov bilan yuklanadi.
+    - reader berilsa, a'zolik har bir chat uchun bir marta tekshiriladi.
+    - Takroriy, topilmagan, chatsiz va reader a'zo bo'lmagan chatdagi id lar PermissionError
+      ko'tarmasdan tashlab yuboriladi; faqat belgilangan xabarlar ro'yxati qaytariladi.
+    """
+    loader = MessageLoader()
+    # Tartibni saqlagan holda takrorlarni olib tashlash
+    unique_ids = list(dict.fromkeys(loader.load(message_id) for message_id in message_ids))
+    loader.dispatch()
+
+    allowed_chats = {}
+    marked = []
+    for message_id in unique_ids:
+        message = loader.get(message_id)
+        if message is None:
+            logger.debug("mark_messages_as_read: message not found: %s", message_id)
+            continue
+        if reader is not None:
+            if message.chat_id not in allowed_chats:
+                allowed_chats[message.chat_id] = message.chat is not None and _is_chat_member(message.chat, reader)
+            if not allowed_chats[message.chat_id]:
+                logger.debug("mark_messages_as_read: user %s is not a member of the chat of message %s", get_object_id(reader), message_id)
+                continue
+        # A'zolik yuqorida tekshirildi
+        marked.append(mark_message_as_read(message))
+    return marked
+
+
 def delete_message(message_or_id: Union[Message, int], actor: Optional[User] = None) -> bool:
     """
     Xabarni o'chiradi. Agar actor berilgan bo'lsa, faqat yuboruvchi yoki staff o'chirishi mumkin.
@@ -116,6 +249,9 @@ def delete_message(message_or_id: Union[Message, int], actor: Optional[User] = N
     message = _resolve_message(message_or_id)
     if message is None:
         logger.debug("delete_message: message not found: %s", message_or_id)
+        return False
+
+    if actor is not None:
         if not (actor.is_staff or getattr(message, "sender_id", None) == get_object_id(actor)):
             logger.warning(
                 "User %s attempted to delete message %s without permission.",
@@ -123,10 +259,6 @@ def delete_message(message_or_id: Union[Message, int], actor: Optional[User] = N
                 get_object_id(message),
             )
             raise PermissionError("Actor is not allowed to delete this message.")
-                get_object_id(actor),
-                get_object_id(message),
-            )
-            raise PermissionError("Actor is not allowed to delete this message.")
 
     message.delete()
     return True
@@ -135,8 +267,14 @@ def delete_message(message_or_id: Union[Message, int], actor: Optional[User] = N
 def edit_message(message_or_id: Union[Message, int], actor: Optional[User], new_content: str) -> Message:
     """
     Xabar matnini tahrirlash. Actor yuboruvchi (yoki staff) bo'lishi kerak. Yangilangan Message ni qaytaradi.
-    - Yangi matn bo'sh emasligini tekshiradi va mavjud bo'lsa full_clean chaqiradi.
+    - Yangi matnni tekshiradi (bo'sh emas, MAX_MESSAGE_LENGTH dan oshmaydi); noto'g'ri bo'lsa ValidationError,
+      message.content esa o'zgarmaydi.
+    - Xabar topilmasa Message.DoesNotExist ko'taradi.
     """
+    message = _resolve_message(message_or_id)
+    if message is None:
+        raise Message.DoesNotExist(f"Message {message_or_id} does not exist.")
+
     if actor is not None:
         if not (actor.is_staff or getattr(message, "sender_id", None) == get_object_id(actor)):
             logger.warning(
@@ -145,25 +283,11 @@ def edit_message(message_or_id: Union[Message, int], actor: Optional[User], new_
                 get_object_id(message),
             )
             raise PermissionError("Actor is not allowed to edit this message.")
-                get_object_id(actor),
-                get_object_id(message),
-            )
-            raise PermissionError("Actor is not allowed to edit this message.")
 
-    new_content = (new_content or "").strip()
     try:
-        message.full_clean()
+        message.content = _clean_content(new_content)
     except ValidationError as e:
-        msg_id = get_object_id(message)
-        logger.warning("Validation error when editing message %s: %s", msg_id, e)
-        raise
-    message.save(update_fields=["content"])
-    return message
-        logger.warning("Validation error when editing message %s: %s", msg_id, e)
+        logger.warning("Validation error when editing message %s: %s", get_object_id(message), e)
         raise
     message.save(update_fields=["content"])
     return message
-
-
-
-
@@ -2,6 +2,7 @@ from typing import Optional, List, Tuple
 import logging
 
 from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, QuerySet
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 
 from ..models import User
@@ -10,66 +11,133 @@ from chat.models import User, Profile, FriendRequest, Notification
 logger = logging.getLogger(__name__)
 
 
-def get_profile(user: User, create_if_missing: bool = False) -> Optional[Profile]:
+def get_profile(user: User, defaults: Optional[dict] = None) -> Optional[Profile]:
     """
     Return the Profile for the given user.
 
-    If create_if_missing is True, creates and returns a Profile when none exists.
-    Returns None when profile is missing and create_if_missing is False.
+    If defaults is given, creates and returns a Profile built from them when none
+    exists; they must include every required field (e.g. age).
+    Returns None when profile is missing and no defaults are given.
+    The result is cached on the user instance (`_profile_cache`) so repeated
+    calls within the same request do not hit the database again.
     """
-    try:
-        return Profile.objects.get(user=user)
-    except Profile.DoesNotExist:
-        if create_if_missing:
-            return Profile.objects.create(user=user)
-        logger.debug("Profile does not exist for user id=%s", getattr(user, "id", None))
-        return None
+    profile = getattr(user, "_profile_cache", None)
+    if profile is not None:
+        return profile
+
+    profile = Profile.objects.select_related("user").filter(user_id=user.pk).first()
+    if profile is None:
+        if defaults is None:
+            logger.debug("Profile does not exist for user id=%s", getattr(user, "id", None))
+            return None
+        # get_or_create handles a concurrent insert via the unique user column
+        profile, _ = Profile.objects.get_or_create(user=user, defaults=defaults)
 
+    user._profile_cache = profile
+    return profile
+
+
+# Scalar Profile fields that update_profile_fast may write without model validation
+FAST_PROFILE_FIELDS = {"bio", "age"}
 
-def update_profile(user: User, data: dict, allowed_fields: Optional[List[str]] = None) -> Profile:
+
+def update_profile_safe(user: User, data: dict, allowed_fields: Optional[List[str]] = None) -> Profile:
     """
     Update user's profile with provided data.
 
     - allowed_fields: optional whitelist of profile fields that can be updated.
     - Raises ValueError on invalid input or ValidationError from model cleaning.
+    - Use this path for file/image fields or whenever validators must run.
+    - When the user has no profile yet, one is created from data, which must
+      then provide the required fields (ValidationError otherwise).
     """
-    profile = get_profile(user, create_if_missing=True)
-    if profile is None:
-        raise ValueError("Unable to obtain or create profile for user.")
+    profile = get_profile(user)
+    created = profile is None
+    if created:
+        profile = Profile(user=user)
 
     if allowed_fields is None:
         # adjust allowed fields to your Profile model actual fields
         allowed_fields = ["bio", "age", "image", "display_name"]
 
-    changed = False
+    changed_fields = []
     for field, value in data.items():
         if field in allowed_fields and hasattr(profile, field):
             setattr(profile, field, value)
-            changed = True
+            changed_fields.append(field)
         else:
             logger.debug("Attempt to update disallowed or unknown field '%s' on Profile", field)
 
-    if not changed:
+    if not changed_fields and not created:
         logger.debug("No allowed fields provided to update for user id=%s", getattr(user, "id", None))
         return profile
 
     # Optional: validate before saving
     try:
-        profile.full_clean()
+        # A new profile's unique user column is enforced by the INSERT itself (see _create_profile)
+        profile.full_clean(validate_unique=not created)
     except ValidationError as e:
         logger.warning("Profile validation failed for user id=%s: %s", getattr(user, "id", None), e)
+        # The cached instance now holds the rejected values; force a reload from the DB
+        user.__dict__.pop("_profile_cache", None)
         raise
 
-    profile.save(update_fields=[f for f in allowed_fields if hasattr(profile, f)])
+    if created:
+        profile = _create_profile(user, profile, changed_fields)
+        user._profile_cache = profile
+    else:
+        profile.save(update_fields=changed_fields)
     return profile
 
 
+def _create_profile(user: User, profile: Profile, changed_fields: List[str]) -> Profile:
+    """
+    Insert a validated, unsaved profile.
+
+    If a concurrent request created the profile first, the unique user column
+    raises IntegrityError; the existing row is then re-read and updated instead.
+    """
+    try:
+        with transaction.atomic():
+            profile.save(force_insert=True)
+        return profile
+    except IntegrityError:
+        existing = Profile.objects.filter(user_id=user.pk).first()
+        if existing is None:
+            raise
+        logger.debug("Profile for user id=%s was created concurrently; updating it", getattr(user, "id", None))
+
+    for field in changed_fields:
+        setattr(existing, field, getattr(profile, field))
+    if changed_fields:
+        existing.save(update_fields=changed_fields)
+    return existing
+
+
+def update_profile_fast(user: User, data: dict) -> int:
+    """
+    Update scalar profile fields (see FAST_PROFILE_FIELDS) with a single UPDATE query.
+
+    Skips loading the profile and model validation; other keys are ignored.
+    Returns the number of rows updated (0 when the user has no profile).
+    """
+    allowed = {k: v for k, v in data.items() if k in FAST_PROFILE_FIELDS}
+    if not allowed:
+        logger.debug("No fast-updatable fields provided for user id=%s", getattr(user, "id", None))
+        return 0
+
+    updated = Profile.objects.filter(user=user).update(**allowed)
+    # The cached instance from get_profile no longer matches the row
+    user.__dict__.pop("_profile_cache", None)
+    return updated
+
+
 def send_friend_request(from_user: User, to_user: User) -> FriendRequest:
     """
     Create a friend request from from_user to to_user.
 
     - Prevents sending request to self.
-    - Uses get_or_create to avoid duplicates (honors unique_together on the model).
+    - Uses get_or_create to avoid duplicates (honors the unique constraint on the model).
     - Returns the FriendRequest instance (existing or newly created).
     - May raise IntegrityError on DB constraint failures.
     """
@@ -107,23 +175,33 @@ def get_friends(user: User) -> List[User]:
     elif hasattr(FriendRequest, "is_accepted"):
         accepted_field = "is_accepted"
 
+    # Correlated subqueries: the whole lookup runs as a single SELECT with semi-joins
+    sent = FriendRequest.objects.filter(from_user=user, to_user=OuterRef("pk"))
+    received = FriendRequest.objects.filter(from_user=OuterRef("pk"), to_user=user)
+    # Only load the columns UserSerializer renders (skips password, last_login, ...)
+    users = User.objects.only("id", "username", "email", "first_name", "last_name", "is_active", "is_staff")
+
     if accepted_field:
-        sent = FriendRequest.objects.filter(from_user=user, **{accepted_field: True}).values_list("to_user", flat=True)
-        received = FriendRequest.objects.filter(to_user=user, **{accepted_field: True}).values_list("from_user", flat=True)
-        user_ids = set(list(sent) + list(received))
-        return list(User.objects.filter(id__in=user_ids))
+        sent = sent.filter(**{accepted_field: True})
+        received = received.filter(**{accepted_field: True})
+        return list(users.filter(Exists(sent) | Exists(received)))
 
     # Fallback: mutual requests imply friendship
-    sent_to_ids = FriendRequest.objects.filter(from_user=user).values_list("to_user", flat=True)
-    mutual_ids = FriendRequest.objects.filter(from_user__in=sent_to_ids, to_user=user).values_list("from_user", flat=True)
-    return list(User.objects.filter(id__in=set(mutual_ids)))
+    return list(users.filter(Exists(sent), Exists(received)))
 
 
-def get_notifications(user: User):
+def get_notifications(user: User) -> QuerySet[Notification]:
     """
     Return all notifications for a user ordered newest-first.
+
+    The user, message and message sender rendered by NotificationSerializer
+    are joined into the same SELECT to avoid per-row queries.
     """
-    return Notification.objects.filter(user=user).order_by("-created_at")
+    return (
+        Notification.objects.filter(user=user)
+        .select_related("user", "message", "message__sender")
+        .order_by("-created_at")
+    )
 
 
 def mark_notification_as_read(notification_id: int) -> Optional[Notification]:
@@ -141,17 +219,31 @@ def mark_notification_as_read(notification_id: int) -> Optional[Notification]:
         return None
 
 
+def mark_notifications_as_read(notification_ids: List[int], user: User) -> int:
+    """
+    Mark several of the user's notifications as read with a single UPDATE.
+    Returns the number of notifications that changed state.
+    """
+    return Notification.objects.filter(id__in=notification_ids, user=user, is_read=False).update(is_read=True)
+
+
 def delete_notification(notification_id: int) -> bool:
     """
     Delete a notification by id. Returns True if deleted, False if not found.
     """
-    try:
-        notif = Notification.objects.get(id=notification_id)
-        notif.delete()
-        return True
-    except Notification.DoesNotExist:
+    deleted, _ = Notification.objects.filter(id=notification_id).delete()
+    if not deleted:
         logger.debug("Attempted to delete non-existent notification id=%s", notification_id)
-        return False
+    return bool(deleted)
+
+
+def delete_notifications(notification_ids: List[int], user: User) -> int:
+    """
+    Delete several of the user's notifications with a single DELETE.
+    Returns the number of notifications deleted.
+    """
+    deleted, _ = Notification.objects.filter(id__in=notification_ids, user=user).delete()
+    return deleted
 
 
 
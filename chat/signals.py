@@ -0,0 +1,30 @@
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .models import Chat
+from .services.message_services import membership_cache_key
+
+
+def _member_pairs(instance, reverse, pks):
+    # reverse=False: instance Chat, pks foydalanuvchilar; reverse=True: instance User, pks chatlar
+    if reverse:
+        return [(chat_id, instance.pk) for chat_id in pks]
+    return [(instance.pk, user_id) for user_id in pks]
+
+
+@receiver(m2m_changed, sender=Chat.members.through)
+def clear_membership_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Chat a'zoligi o'zgarganda keshlangan ijobiy a'zolik natijalarini o'chiradi,
+    aks holda chiqarilgan foydalanuvchi MEMBERSHIP_CACHE_TIMEOUT davomida xabar yubora oladi.
+    """
+    if action == 'pre_clear':
+        # clear() post_clear da pk_set bermaydi, shuning uchun ro'yxatni oldindan olamiz
+        related = instance.chats if reverse else instance.members
+        instance._cleared_member_pks = list(related.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        pks = instance.__dict__.pop('_cleared_member_pks', [])
+        cache.delete_many([membership_cache_key(*pair) for pair in _member_pairs(instance, reverse, pks)])
+    elif action == 'post_remove':
+        cache.delete_many([membership_cache_key(*pair) for pair in _member_pairs(instance, reverse, pk_set)])
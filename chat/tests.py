@@ -1,3 +1,354 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+from rest_framework.renderers import JSONRenderer
+
+from .models import User, Chat, Message, Attachment, FriendRequest, Notification, Profile
+from .read_serializers import FastMessageSerializer
+from .renderers import OrjsonRenderer
+from .serializers import (
+    FriendRequestSerializer,
+    MessageSerializer,
+    MessageDetailSerializer,
+    NotificationSerializer,
+    UserSerializer,
+)
+from .services import user_services
+from .services.message_services import (
+    MAX_MESSAGE_LENGTH,
+    delete_message,
+    edit_message,
+    get_chat_messages,
+    mark_message_as_read,
+    mark_messages_as_read,
+    send_message,
+    send_messages_bulk,
+)
+from .services.user_services import (
+    delete_notifications,
+    get_friends,
+    get_notifications,
+    get_profile,
+    mark_notifications_as_read,
+    update_profile_fast,
+    update_profile_safe,
+)
+
+
+class ChatTestCase(TestCase):
+    def setUp(self):
+        # The membership cache outlives the per-test DB rollback
+        cache.clear()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.chat = Chat.objects.create(name='general', creator=self.alice)
+        self.chat.members.add(self.bob)
+
+
+class ChatMessagesTests(ChatTestCase):
+    def test_history_page_uses_constant_queries(self):
+        for i in range(5):
+            message = Message.objects.create(sender=[self.alice, self.bob][i % 2], chat=self.chat, content=str(i))
+            Attachment.objects.create(message=message, file='attachments/a.txt', added_by=self.bob)
+
+        # messages + sender JOIN; attachments are not rendered, so not prefetched
+        with self.assertNumQueries(1):
+            data = MessageDetailSerializer(get_chat_messages(self.chat), many=True).data
+        self.assertEqual([row['content'] for row in data], ['0', '1', '2', '3', '4'])
+        self.assertEqual(data[1]['sender']['username'], 'bob')
+
+        with self.assertNumQueries(1):
+            data = MessageSerializer(get_chat_messages(self.chat), many=True).data
+        self.assertEqual(data[1]['sender_username'], 'bob')
+
+
+class ProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+
+    def test_failed_validation_does_not_poison_cache(self):
+        Profile.objects.create(user=self.user, age=3)
+        get_profile(self.user)
+        with self.assertRaises(ValidationError):
+            update_profile_safe(self.user, {'age': 'notanint'})
+        self.assertEqual(get_profile(self.user).age, 3)
+
+    def test_creates_missing_profile_from_data(self):
+        profile = update_profile_safe(self.user, {'age': 7, 'bio': 'hi'})
+        self.assertEqual(Profile.objects.get(user=self.user).age, 7)
+        self.assertIs(get_profile(self.user), profile)
+
+    def test_missing_required_field_raises_validation_error(self):
+        with self.assertRaises(ValidationError):
+            update_profile_safe(self.user, {'bio': 'hi'})
+        self.assertFalse(Profile.objects.exists())
+
+    def test_concurrent_create_updates_existing_profile(self):
+        # Another request inserts the profile after our lookup returned None
+        existing = Profile.objects.create(user=self.user, age=3, bio='old')
+        with mock.patch.object(user_services, 'get_profile', return_value=None):
+            profile = update_profile_safe(self.user, {'age': 7})
+        self.assertEqual(profile.pk, existing.pk)
+        existing.refresh_from_db()
+        self.assertEqual((existing.age, existing.bio), (7, 'old'))
+        self.assertEqual(Profile.objects.count(), 1)
+
+
+class UpdateProfileFastTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+
+    def test_single_update_ignores_other_keys_and_drops_cache(self):
+        Profile.objects.create(user=self.user, age=3, bio='old')
+        get_profile(self.user)
+        with self.assertNumQueries(1):
+            updated = update_profile_fast(self.user, {'bio': 'new', 'age': 4, 'image': 'x.png', 'user': None})
+        self.assertEqual(updated, 1)
+        profile = get_profile(self.user)
+        self.assertEqual((profile.bio, profile.age), ('new', 4))
+        self.assertFalse(profile.image)
+
+    def test_user_without_profile_returns_zero(self):
+        self.assertEqual(update_profile_fast(self.user, {'bio': 'new'}), 0)
+        self.assertFalse(Profile.objects.exists())
+
+
+class FriendsTests(TestCase):
+    def test_only_mutual_requests_are_friends(self):
+        alice, bob, carol, dave = [User.objects.create(username=n) for n in ('alice', 'bob', 'carol', 'dave')]
+        FriendRequest.objects.create(from_user=alice, to_user=bob)
+        FriendRequest.objects.create(from_user=bob, to_user=alice)
+        FriendRequest.objects.create(from_user=alice, to_user=carol)
+        FriendRequest.objects.create(from_user=dave, to_user=alice)
+
+        with self.assertNumQueries(1):
+            friends = get_friends(alice)
+        self.assertEqual([u.username for u in friends], ['bob'])
+        self.assertEqual(get_friends(carol), [])
+
+
+class NotificationTests(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        message = Message.objects.create(sender=self.bob, chat=self.chat, content='ping')
+        self.mine = [Notification.objects.create(user=self.alice, message=message) for _ in range(3)]
+        self.theirs = Notification.objects.create(user=self.bob, message=message)
+
+    def test_list_renders_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = NotificationSerializer(get_notifications(self.alice), many=True).data
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['message']['sender_username'], 'bob')
+
+    def test_batch_mark_as_read_is_scoped_to_user(self):
+        ids = [n.id for n in self.mine] + [self.theirs.id]
+        with self.assertNumQueries(1):
+            self.assertEqual(mark_notifications_as_read(ids, self.alice), 3)
+        self.assertEqual(mark_notifications_as_read(ids, self.alice), 0)
+        self.theirs.refresh_from_db()
+        self.assertFalse(self.theirs.is_read)
+
+    def test_batch_delete_is_scoped_to_user(self):
+        ids = [self.mine[0].id, self.mine[1].id, self.theirs.id]
+        self.assertEqual(delete_notifications(ids, self.alice), 2)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertTrue(Notification.objects.filter(id=self.theirs.id).exists())
+
+    @override_settings(TIME_ZONE='Asia/Tashkent')
+    def test_created_at_matches_previous_datetime_field(self):
+        old_field = drf_serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
+        notification = self.mine[0]
+        self.assertEqual(
+            NotificationSerializer(notification).data['created_at'],
+            old_field.to_representation(notification.created_at),
+        )
+        friend_request = FriendRequest.objects.create(from_user=self.alice, to_user=self.bob)
+        self.assertEqual(
+            FriendRequestSerializer(friend_request).data['created_at'],
+            old_field.to_representation(friend_request.created_at),
+        )
+
+
+class SendMessagesBulkTests(ChatTestCase):
+    def test_creates_non_blank_messages(self):
+        created = send_messages_bulk(self.bob, self.chat, ['one', '  ', ' two ', None])
+        self.assertEqual([m.content for m in created], ['one', 'two'])
+        self.assertEqual(Message.objects.filter(chat=self.chat).count(), 2)
+
+    def test_rejects_non_member(self):
+        outsider = User.objects.create(username='carol')
+        with self.assertRaises(PermissionError):
+            send_messages_bulk(outsider, self.chat, ['hi'])
+        self.assertFalse(Message.objects.exists())
+
+    def test_rejects_too_long_content(self):
+        with self.assertRaises(ValidationError):
+            send_messages_bulk(self.alice, self.chat, ['ok', 'x' * 5000])
+        self.assertFalse(Message.objects.exists())
+
+
+class MembershipCacheTests(ChatTestCase):
+    def test_removed_member_is_rejected(self):
+        message = send_message(self.bob, 'hi', self.chat)  # caches bob's membership
+        self.chat.members.remove(self.bob)
+        with self.assertRaises(PermissionError):
+            send_message(self.bob, 'still here?', self.chat)
+        with self.assertRaises(PermissionError):
+            mark_message_as_read(message, reader=self.bob)
+
+    def test_reverse_remove_and_clear_invalidate_cache(self):
+        send_message(self.bob, 'hi', self.chat)
+        self.bob.chats.remove(self.chat)
+        with self.assertRaises(PermissionError):
+            send_message(self.bob, 'hi', self.chat)
+
+        self.chat.members.add(self.bob)
+        send_message(self.bob, 'back', self.chat)
+        self.chat.members.clear()
+        with self.assertRaises(PermissionError):
+            send_message(self.bob, 'hi', self.chat)
+
+
+class KeysetPaginationTests(ChatTestCase):
+    def test_pages_through_tied_timestamps(self):
+        tied = timezone.now()
+        for i in range(7):
+            ts = tied if i < 4 else tied + timedelta(seconds=i)
+            Message.objects.create(sender=self.alice, chat=self.chat, content=str(i), timestamp=ts)
+
+        def walk(newest_first):
+            seen, cursor = [], None
+            while True:
+                page = list(get_chat_messages(self.chat, limit=3, cursor=cursor, newest_first=newest_first))
+                if not page:
+                    return seen
+                seen += [m.content for m in page]
+                cursor = (page[-1].timestamp, page[-1].id)
+
+        self.assertEqual(walk(False), ['0', '1', '2', '3', '4', '5', '6'])
+        self.assertEqual(walk(True), ['6', '5', '4', '3', '2', '1', '0'])
+
+
+class FastSerializerTests(ChatTestCase):
+    def test_fast_serializer_matches_detail_serializer(self):
+        Message.objects.create(sender=self.alice, chat=self.chat, content='hi')
+        Message.objects.create(sender=self.bob, chat=self.chat, content='hey')
+        messages = get_chat_messages(self.chat)
+        expected = [dict(row) for row in MessageDetailSerializer(messages, many=True).data]
+        self.assertEqual(FastMessageSerializer(messages, many=True).data, expected)
+        self.assertEqual(FastMessageSerializer(messages[0]).data, expected[0])
+
+
+class EditDeleteMessageTests(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.message = Message.objects.create(sender=self.bob, chat=self.chat, content='hi')
+        self.staff = User.objects.create(username='admin', is_staff=True)
+
+    def test_delete_missing_message_returns_false(self):
+        self.assertFalse(delete_message(999999, actor=self.bob))
+
+    def test_delete_by_non_owner_is_rejected(self):
+        with self.assertRaises(PermissionError):
+            delete_message(self.message.id, actor=self.alice)
+        self.assertTrue(Message.objects.filter(id=self.message.id).exists())
+
+    def test_delete_by_owner_or_staff(self):
+        other = Message.objects.create(sender=self.bob, chat=self.chat, content='bye')
+        self.assertTrue(delete_message(self.message.id, actor=self.bob))
+        self.assertTrue(delete_message(other, actor=self.staff))
+        self.assertFalse(Message.objects.exists())
+
+    def test_edit_missing_message_raises(self):
+        with self.assertRaises(Message.DoesNotExist):
+            edit_message(999999, self.bob, 'new')
+
+    def test_edit_by_non_owner_is_rejected(self):
+        with self.assertRaises(PermissionError):
+            edit_message(self.message.id, self.alice, 'new')
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.content, 'hi')
+
+    def test_edit_by_owner_or_staff(self):
+        self.assertEqual(edit_message(self.message.id, self.bob, ' edited ').content, 'edited')
+        edit_message(self.message, self.staff, 'moderated')
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.content, 'moderated')
+
+
+class MarkMessagesAsReadTests(ChatTestCase):
+    def test_accepts_string_ids_and_skips_duplicates(self):
+        send_messages_bulk(self.alice, self.chat, ['a', 'b'])
+        first, second = Message.objects.order_by('id')
+        ids = [str(first.id), second.id, str(first.id), '999999']
+        marked = mark_messages_as_read(ids, reader=self.bob)
+        self.assertEqual([m.id for m in marked], [first.id, second.id])
+
+    def test_skips_foreign_and_chatless_messages(self):
+        carol = User.objects.create(username='carol')
+        other_chat = Chat.objects.create(name='private', creator=carol)
+        mine = Message.objects.create(sender=self.alice, chat=self.chat, content='a')
+        foreign = Message.objects.create(sender=carol, chat=other_chat, content='b')
+        chatless = Message.objects.create(sender=carol, content='c')
+        also_mine = Message.objects.create(sender=self.alice, chat=self.chat, content='d')
+
+        ids = [mine.id, foreign.id, chatless.id, also_mine.id]
+        # one load, then one membership check per distinct chat (the chatless message needs none)
+        with self.assertNumQueries(3):
+            marked = mark_messages_as_read(ids, reader=self.bob)
+        self.assertEqual([m.id for m in marked], [mine.id, also_mine.id])
+
+
+class SenderRenderingTests(ChatTestCase):
+    def test_each_sender_rendered_once_per_call(self):
+        for i in range(6):
+            Message.objects.create(sender=[self.alice, self.bob][i % 2], chat=self.chat, content=str(i))
+        original = UserSerializer.to_representation
+        with mock.patch.object(UserSerializer, 'to_representation', autospec=True, side_effect=original) as render:
+            data = MessageDetailSerializer(get_chat_messages(self.chat), many=True).data
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual([row['sender']['username'] for row in data], ['alice', 'bob'] * 3)
+        self.assertIsNot(data[0]['sender'], data[2]['sender'])
+
+    def test_no_stale_sender_across_calls(self):
+        Message.objects.create(sender=self.bob, chat=self.chat, content='hi')
+        self.assertEqual(MessageDetailSerializer(get_chat_messages(self.chat), many=True).data[0]['sender']['email'], '')
+
+        # Bypasses save(), so nothing could have refreshed a process-wide cache
+        User.objects.filter(pk=self.bob.pk).update(email='bob@example.com')
+        data = MessageDetailSerializer(get_chat_messages(self.chat), many=True).data
+        self.assertEqual(data[0]['sender']['email'], 'bob@example.com')
+
+
+class OrjsonRendererTests(TestCase):
+    def test_matches_drf_json_renderer(self):
+        data = {1: 'x', 'naive': timezone.now().replace(tzinfo=None), 'aware': timezone.now(), 'items': [1, 2.5, None]}
+        self.assertEqual(json.loads(OrjsonRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(OrjsonRenderer().render(None), b'')
+
+
+class MessageContentValidationTests(ChatTestCase):
+    def test_send_message_rejects_empty_and_too_long_content(self):
+        for content in ['', '   ', None, 'x' * (MAX_MESSAGE_LENGTH + 1)]:
+            with self.assertRaises(ValidationError) as ctx:
+                send_message(self.bob, content, self.chat)
+            self.assertIn('content', ctx.exception.message_dict)
+        self.assertFalse(Message.objects.exists())
+        self.assertEqual(send_message(self.bob, 'x' * MAX_MESSAGE_LENGTH, self.chat).content, 'x' * MAX_MESSAGE_LENGTH)
+
+    def test_edit_message_rejects_invalid_content_without_changing_it(self):
+        message = send_message(self.bob, 'hi', self.chat)
+        for content in ['  ', 'x' * (MAX_MESSAGE_LENGTH + 1)]:
+            with self.assertRaises(ValidationError):
+                edit_message(message, self.bob, content)
+            self.assertEqual(message.content, 'hi')
+            message.refresh_from_db()
+            self.assertEqual(message.content, 'hi')